@@ -6,6 +6,7 @@ from utils import logger
 
 class AgentState(TypedDict):
     messages: List[Dict[str, str]]
+    options: Dict[str, Any]
     response: Dict[str, Any]
 
 logic = CommuterAgentLogic()
@@ -43,7 +44,7 @@ def process_request(state: AgentState):
     logger.info(f"Processing message: {last_message}")
     
     try:
-        result = logic.process_query(last_message)
+        result = logic.process_query(last_message, state.get('options') or {})
         # Wrap result in message format as per requirements
         response = AgentResponse(
             agent_name="commuter-agent",
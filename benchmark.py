@@ -0,0 +1,150 @@
+"""
+Throughput benchmark for the multi-worker server mode.
+
+Starts the server offline (no Google Maps key, so the agent uses mock data and makes no
+upstream calls) with 1..N worker processes and drives it with concurrent keep-alive clients.
+Prints requests/second, latency percentiles and speedup over a single worker.
+
+Usage:
+    python benchmark.py --workers 1,2,4 --duration 10 --connections 64
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+QUERIES = [
+    "What's the best route from home to downtown?",
+    "What is the traffic like on Main Street?",
+    "How should I travel from home to the airport, which mode?",
+]
+
+def _client_thread(port: int, stop_at: float, offset: int, latencies: list):
+    """Send requests over one keep-alive connection until stop_at."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    count = offset
+    while time.time() < stop_at:
+        body = json.dumps({"messages": [{"role": "user", "content": QUERIES[count % len(QUERIES)]}]})
+        started_at = time.perf_counter()
+        try:
+            connection.request("POST", "/commuter-agent", body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                latencies.append(time.perf_counter() - started_at)
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        count += 1
+    connection.close()
+
+def _client_process(args):
+    """One load-generator process running several client threads; returns their latencies."""
+    port, stop_at, threads, process_index = args
+    latencies = []
+    workers = [
+        threading.Thread(target=_client_thread, args=(port, stop_at, process_index * threads + i, latencies))
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies
+
+def _wait_until_ready(port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+def _start_server(workers: int, port: int, executor_threads: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        API_HOST="127.0.0.1",
+        API_PORT=str(port),
+        WORKERS=str(workers),
+        RELOAD="false",
+        AGENT_EXECUTOR_THREADS=str(executor_threads),
+        GOOGLE_MAPS_API_KEY="",
+        SUPERVISOR_ENABLED="false",
+    )
+    return subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+def _percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(fraction * (len(samples) - 1)))]
+
+def run(workers: int, args) -> dict:
+    """Benchmark one worker count and return its results."""
+    server = _start_server(workers, args.port, args.executor_threads)
+    try:
+        _wait_until_ready(args.port)
+        threads = max(1, args.connections // args.client_processes)
+        # Warm up every worker before measuring
+        _client_process((args.port, time.time() + 1.0, threads, 0))
+        stop_at = time.time() + args.duration
+        with multiprocessing.Pool(args.client_processes) as pool:
+            results = pool.map(
+                _client_process,
+                [(args.port, stop_at, threads, i) for i in range(args.client_processes)]
+            )
+        latencies = sorted(latency for result in results for latency in result)
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "rps": len(latencies) / args.duration,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+    }
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *[2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus], cpus})
+    parser = argparse.ArgumentParser(description="Benchmark commuter-agent throughput across worker counts.")
+    parser.add_argument("--workers", default=",".join(str(w) for w in default_workers),
+                        help="Comma-separated worker counts to test (default: 1 up to the CPU count)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to measure each worker count")
+    parser.add_argument("--connections", type=int, default=64, help="Concurrent client connections")
+    parser.add_argument("--client-processes", type=int, default=max(1, min(4, cpus // 2)),
+                        help="Load-generator processes (keep below the CPU count so clients do not starve the server)")
+    parser.add_argument("--executor-threads", type=int, default=32, help="AGENT_EXECUTOR_THREADS for the server")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    results = [run(int(w), args) for w in args.workers.split(",")]
+    baseline = results[0]["rps"] or 1.0
+    print(f"{'workers':>7} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+    for result in results:
+        print(f"{result['workers']:>7} {result['requests']:>9} {result['rps']:>9.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['rps'] / baseline:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
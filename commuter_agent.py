@@ -1,10 +1,47 @@
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from concurrent.futures import Future
+from contextvars import ContextVar
 import random
 import re
+import threading
 import googlemaps
 from config import Config
+from corridors import corridor_stats
+from incidents import incident_index
+from polyline import decode_polyline, route_geometry
 from utils import logger
 
+class DirectionsMemo:
+    """
+    Shares identical Directions lookups between the items of one batch.
+    The first caller for a key fetches it; concurrent callers wait for that result.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[Tuple, Future] = {}
+        self.lookups = 0
+        self.deduplicated = 0
+
+    def get(self, key: Tuple, fetch: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.lookups += 1
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+            else:
+                self.deduplicated += 1
+        if owner:
+            try:
+                future.set_result(fetch())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+# Set by the batch endpoint; main._run_agent copies the context into the agent executor's threads
+directions_memo: ContextVar[Optional[DirectionsMemo]] = ContextVar("directions_memo", default=None)
+
 class CommuterAgentLogic:
     def __init__(self):
         """Initialize the commuter agent with Google Maps API client if available."""
@@ -43,6 +80,77 @@ class CommuterAgentLogic:
         
         return None
     
+    def _directions(self, origin: str, destination: str, mode: str, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Call the Directions API, sharing the result with lookups for the same (origin, destination, mode)
+        in the same batch. Callers pass the same options for a given mode, except that route recommendations
+        ask for alternatives; in a batch every driving lookup does, since the first route is the primary
+        route the others read, so route, traffic and mode questions share one driving call.
+        """
+        memo = directions_memo.get()
+        if memo is not None and mode == "driving":
+            kwargs["alternatives"] = True
+
+        def fetch():
+            result = self.gmaps.directions(origin=origin, destination=destination, mode=mode, **kwargs)
+            corridor_stats.record_outcome(origin, destination, mode, bool(result))
+            self._index_directions(origin, destination, mode, result)
+            return result
+
+        if memo is None:
+            return fetch()
+        return memo.get((origin, destination, mode), fetch)
+    
+    def _traffic_level(self, leg: Dict[str, Any]) -> str:
+        """Classify a leg's traffic from the delay between duration and duration_in_traffic."""
+        duration = leg['duration']['value']
+        traffic_delay = leg.get('duration_in_traffic', {}).get('value', duration) - duration
+        if traffic_delay > 600:  # > 10 minutes delay
+            return "Heavy"
+        elif traffic_delay > 300:  # > 5 minutes delay
+            return "Moderate"
+        return "Light"
+    
+    def _index_directions(self, origin: str, destination: str, mode: str, directions_result: List[Dict[str, Any]]):
+        """
+        Record incidents from step warnings (any mode), geolocated at each step's start_location.
+        For driving results, also record the route's distance and its endpoints' location and traffic status,
+        which only driving results measure.
+        """
+        try:
+            for route in directions_result or []:
+                for leg in route.get('legs', []):
+                    for step in leg.get('steps', []):
+                        location = step.get('start_location')
+                        if not location:
+                            continue
+                        for warning in step.get('warnings', []):
+                            if 'accident' in warning.lower() or 'construction' in warning.lower():
+                                incident_index.add(warning, location['lat'], location['lng'])
+            if directions_result and mode == "driving":
+                leg = directions_result[0]['legs'][0]
+                corridor_stats.record_distance(origin, destination, leg['distance']['value'])
+                status = self._traffic_level(leg)
+                for name, key in ((origin, 'start_location'), (destination, 'end_location')):
+                    location = leg.get(key)
+                    if location and name.lower() != "current location":
+                        incident_index.record_place(name, location['lat'], location['lng'], status)
+        except Exception as e:
+            logger.warning(f"Failed to index directions result: {e}")
+    
+    def _prune_reason(self, origin: str, destination: str, mode: str, distance: Optional[int]) -> Optional[str]:
+        """
+        Reason to skip the upstream lookup for a mode on this corridor, or None to query it.
+        """
+        if mode == "bicycling" and distance is not None and distance > Config.BIKE_MAX_DISTANCE_METERS:
+            return f"Trip of {self._format_distance(distance)} exceeds the {self._format_distance(Config.BIKE_MAX_DISTANCE_METERS)} bike limit"
+        if mode == "transit" and distance is not None and distance < Config.TRANSIT_MIN_DISTANCE_METERS:
+            return f"Trip of {self._format_distance(distance)} is too short for transit"
+        empty_streak = corridor_stats.empty_streak(origin, destination, mode)
+        if Config.MODE_MAX_EMPTY_RESULTS > 0 and empty_streak >= Config.MODE_MAX_EMPTY_RESULTS:
+            return f"No {mode} route found for this trip in the last {empty_streak} lookups"
+        return None
+    
     def _format_duration(self, seconds: int) -> str:
         """Convert seconds to human-readable duration."""
         if seconds < 60:
@@ -61,14 +169,16 @@ class CommuterAgentLogic:
         km = meters / 1000
         return f"{km:.1f} km"
     
-    def process_query(self, query: str) -> Dict[str, Any]:
+    def process_query(self, query: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Process the user query and return a structured response.
+        Options come from the request's optional "options" object (e.g. include_geometry).
         """
         query = query.lower()
+        options = options or {}
         
         if "route" in query or "go to" in query:
-            return self.get_route_recommendation(query)
+            return self.get_route_recommendation(query, options)
         elif "traffic" in query:
             return self.get_traffic_conditions(query)
         elif "mode" in query or "how" in query:
@@ -79,12 +189,14 @@ class CommuterAgentLogic:
                 "message": "I can help you with route planning, traffic updates, and travel mode suggestions. Please ask specifically about these topics."
             }
 
-    def get_route_recommendation(self, query: str) -> Dict[str, Any]:
+    def get_route_recommendation(self, query: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Get route recommendations using Google Maps Directions API.
         Returns 3 route options with duration, distance, and traffic info.
+        With options["include_geometry"], each route also carries a simplified encoded polyline.
         Falls back to mock data if API is unavailable.
         """
+        options = options or {}
         if not self.gmaps:
             logger.info("Using mock data for route recommendation")
             return self._get_mock_route_recommendation()
@@ -98,9 +210,9 @@ class CommuterAgentLogic:
         
         try:
             # Get directions with alternatives
-            directions_result = self.gmaps.directions(
-                origin=origin,
-                destination=destination,
+            directions_result = self._directions(
+                origin,
+                destination,
                 alternatives=True,
                 mode="driving",
                 traffic_model="best_guess",
@@ -138,13 +250,16 @@ class CommuterAgentLogic:
                     if road_match:
                         summary = f"Via {road_match.group(1)}"
                 
-                routes.append({
+                route_data = {
                     "id": idx,
                     "description": summary,
                     "duration": self._format_duration(duration_in_traffic),
                     "distance": self._format_distance(distance),
                     "traffic": traffic
-                })
+                }
+                if options.get("include_geometry"):
+                    route_data["geometry"] = self._route_geometry(route, options)
+                routes.append(route_data)
             
             # Ensure we have at least 3 routes (duplicate if needed for demo)
             while len(routes) < 3:
@@ -165,6 +280,18 @@ class CommuterAgentLogic:
             logger.error(f"Error calling Google Maps API: {e}")
             return self._get_mock_route_recommendation()
     
+    def _route_geometry(self, route: Dict[str, Any], options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Simplified geometry for a route's overview_polyline, or None if it has none."""
+        encoded = route.get('overview_polyline', {}).get('points')
+        if not encoded:
+            return None
+        try:
+            tolerance = max(0.0, float(options.get("geometry_tolerance_meters", 10.0)))
+            return route_geometry(encoded, tolerance, Config.GEOMETRY_MAX_POINTS)
+        except Exception as e:
+            logger.warning(f"Failed to build route geometry: {e}")
+            return None
+    
     def _get_mock_route_recommendation(self) -> Dict[str, Any]:
         """Fallback mock route recommendation."""
         return {
@@ -215,12 +342,19 @@ class CommuterAgentLogic:
         
         if locations:
             origin, destination = locations
+        else:
+            # Answer from the incident index if we have recently routed through this place
+            known_place = incident_index.lookup_place(location)
+            if known_place:
+                lat, lng, status = known_place
+                incidents = [incident.text for incident in incident_index.near(lat, lng)]
+                return self._traffic_response(location, status, incidents)
         
         try:
             # Get directions to check traffic conditions
-            directions_result = self.gmaps.directions(
-                origin=origin,
-                destination=destination,
+            directions_result = self._directions(
+                origin,
+                destination,
                 mode="driving",
                 traffic_model="best_guess",
                 departure_time="now"
@@ -229,41 +363,16 @@ class CommuterAgentLogic:
             if directions_result:
                 route = directions_result[0]
                 leg = route['legs'][0]
-                duration = leg['duration']['value']
-                duration_in_traffic = leg.get('duration_in_traffic', {}).get('value', duration)
+                status = self._traffic_level(leg)
                 
-                traffic_delay = duration_in_traffic - duration
-                if traffic_delay > 600:
-                    status = "Heavy"
-                elif traffic_delay > 300:
-                    status = "Moderate"
-                else:
-                    status = "Light"
-                
-                # Extract incidents/warnings from steps
-                incidents = []
-                for step in leg.get('steps', []):
-                    warnings = step.get('warnings', [])
-                    for warning in warnings:
-                        if 'accident' in warning.lower() or 'construction' in warning.lower():
-                            incidents.append(warning)
-                
-                if not incidents:
-                    incidents = [
-                        "No major incidents reported",
-                        "Normal traffic flow expected"
-                    ]
+                # Incidents near this route, including ones seen in earlier responses
+                points = decode_polyline(route.get('overview_polyline', {}).get('points', ''))
+                if not points:
+                    points = [(step['start_location']['lat'], step['start_location']['lng'])
+                              for step in leg.get('steps', []) if 'start_location' in step]
+                incidents = [incident.text for incident in incident_index.along_route(points)]
                 
-                return {
-                    "type": "traffic_update",
-                    "location": location.title(),
-                    "current_status": status,
-                    "incidents": incidents[:2],  # Limit to 2 incidents
-                    "peak_hours": {
-                        "morning": "7:00 AM - 9:00 AM",
-                        "evening": "5:00 PM - 7:00 PM"
-                    }
-                }
+                return self._traffic_response(location, status, incidents)
             else:
                 return self._get_mock_traffic_conditions()
                 
@@ -271,6 +380,25 @@ class CommuterAgentLogic:
             logger.error(f"Error calling Google Maps API for traffic: {e}")
             return self._get_mock_traffic_conditions()
     
+    def _traffic_response(self, location: str, status: str, incidents: List[str]) -> Dict[str, Any]:
+        """Build a traffic_update response."""
+        if not incidents:
+            incidents = [
+                "No major incidents reported",
+                "Normal traffic flow expected"
+            ]
+        
+        return {
+            "type": "traffic_update",
+            "location": location.title(),
+            "current_status": status,
+            "incidents": incidents[:2],  # Limit to 2 incidents
+            "peak_hours": {
+                "morning": "7:00 AM - 9:00 AM",
+                "evening": "5:00 PM - 7:00 PM"
+            }
+        }
+    
     def _get_mock_traffic_conditions(self) -> Dict[str, Any]:
         """Fallback mock traffic conditions."""
         conditions = ["Heavy", "Moderate", "Light"]
@@ -308,12 +436,13 @@ class CommuterAgentLogic:
         
         try:
             modes_data = []
+            car_distance = None
             
             # 1. Car (driving)
             try:
-                car_result = self.gmaps.directions(
-                    origin=origin,
-                    destination=destination,
+                car_result = self._directions(
+                    origin,
+                    destination,
                     mode="driving",
                     traffic_model="best_guess",
                     departure_time="now"
@@ -334,48 +463,63 @@ class CommuterAgentLogic:
             except Exception as e:
                 logger.warning(f"Error getting car directions: {e}")
             
+            # Skip modes that cannot be feasible on this corridor (distance or repeated empty results)
+            distance = car_distance if car_distance is not None else corridor_stats.distance(origin, destination)
+            pruned_modes = []
+            prune_reasons = {}
+            for mode_name, api_mode in (("Public Transit", "transit"), ("Bike", "bicycling")):
+                reason = self._prune_reason(origin, destination, api_mode, distance)
+                if reason:
+                    prune_reasons[api_mode] = reason
+                    pruned_modes.append({"mode": mode_name, "reason": reason})
+            if pruned_modes:
+                corridor_stats.record_pruned(len(pruned_modes))
+                logger.info(f"Pruned travel modes: {', '.join(m['mode'] for m in pruned_modes)}")
+            
             # 2. Public Transit
-            try:
-                transit_result = self.gmaps.directions(
-                    origin=origin,
-                    destination=destination,
-                    mode="transit",
-                    departure_time="now"
-                )
-                if transit_result:
-                    leg = transit_result[0]['legs'][0]
-                    transit_time = leg['duration']['value']
-                    # Standard transit fare
-                    transit_cost = 2.5
-                    modes_data.append({
-                        "mode": "Public Transit",
-                        "cost": f"${transit_cost:.2f}",
-                        "time": self._format_duration(transit_time),
-                        "pros": ["Cost-effective", "No parking needed", "Eco-friendly"],
-                        "cons": ["Fixed schedules", "Possible delays", "Less privacy"]
-                    })
-            except Exception as e:
-                logger.warning(f"Error getting transit directions: {e}")
+            if "transit" not in prune_reasons:
+                try:
+                    transit_result = self._directions(
+                        origin,
+                        destination,
+                        mode="transit",
+                        departure_time="now"
+                    )
+                    if transit_result:
+                        leg = transit_result[0]['legs'][0]
+                        transit_time = leg['duration']['value']
+                        # Standard transit fare
+                        transit_cost = 2.5
+                        modes_data.append({
+                            "mode": "Public Transit",
+                            "cost": f"${transit_cost:.2f}",
+                            "time": self._format_duration(transit_time),
+                            "pros": ["Cost-effective", "No parking needed", "Eco-friendly"],
+                            "cons": ["Fixed schedules", "Possible delays", "Less privacy"]
+                        })
+                except Exception as e:
+                    logger.warning(f"Error getting transit directions: {e}")
             
             # 3. Bike
-            try:
-                bike_result = self.gmaps.directions(
-                    origin=origin,
-                    destination=destination,
-                    mode="bicycling"
-                )
-                if bike_result:
-                    leg = bike_result[0]['legs'][0]
-                    bike_time = leg['duration']['value']
-                    modes_data.append({
-                        "mode": "Bike",
-                        "cost": "$0",
-                        "time": self._format_duration(bike_time),
-                        "pros": ["Free", "Healthy exercise", "No emissions"],
-                        "cons": ["Weather dependent", "Physical effort", "Limited range"]
-                    })
-            except Exception as e:
-                logger.warning(f"Error getting bike directions: {e}")
+            if "bicycling" not in prune_reasons:
+                try:
+                    bike_result = self._directions(
+                        origin,
+                        destination,
+                        mode="bicycling"
+                    )
+                    if bike_result:
+                        leg = bike_result[0]['legs'][0]
+                        bike_time = leg['duration']['value']
+                        modes_data.append({
+                            "mode": "Bike",
+                            "cost": "$0",
+                            "time": self._format_duration(bike_time),
+                            "pros": ["Free", "Healthy exercise", "No emissions"],
+                            "cons": ["Weather dependent", "Physical effort", "Limited range"]
+                        })
+                except Exception as e:
+                    logger.warning(f"Error getting bike directions: {e}")
             
             # 4. Rideshare (use driving time + 20% cost premium)
             if modes_data and modes_data[0]["mode"] == "Car":
@@ -392,14 +536,15 @@ class CommuterAgentLogic:
             
             # If we got some real data, use it; otherwise fall back to mock
             if len(modes_data) >= 2:
-                # Ensure we have all 4 modes
-                while len(modes_data) < 4:
-                    # Add missing modes from mock data
-                    mock_modes = self._get_mock_travel_mode()["modes"]
-                    for mock_mode in mock_modes:
-                        if not any(m["mode"] == mock_mode["mode"] for m in modes_data):
-                            modes_data.append(mock_mode)
-                            break
+                # Fill in missing modes from mock data, except ones pruned as infeasible
+                pruned_names = {m["mode"] for m in pruned_modes}
+                for mock_mode in self._get_mock_travel_mode()["modes"]:
+                    if len(modes_data) >= 4:
+                        break
+                    if mock_mode["mode"] in pruned_names:
+                        continue
+                    if not any(m["mode"] == mock_mode["mode"] for m in modes_data):
+                        modes_data.append(mock_mode)
                 
                 # Sort by time (convert time strings to comparable values)
                 def time_to_minutes(time_str):
@@ -420,6 +565,7 @@ class CommuterAgentLogic:
                 return {
                     "type": "travel_mode_suggestion",
                     "modes": modes_data[:4],
+                    "pruned_modes": pruned_modes,
                     "recommendation": recommendation
                 }
             else:
@@ -11,3 +11,34 @@ class Config:
     API_PORT = int(os.getenv("API_PORT", os.getenv("PORT", 8000)))
     SUPERVISOR_URL = os.getenv("SUPERVISOR_URL", "http://supervisor-agent/register")
     GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
+    # Server processes. Default 1: each worker has its own executor, Supervisor identity and
+    # incident/corridor stores, which split N ways. Raise it to use more cores for CPU-bound load.
+    WORKERS = int(os.getenv("WORKERS", os.getenv("WEB_CONCURRENCY", 1)))
+    RELOAD = os.getenv("RELOAD", "false").lower() in ("1", "true", "yes")
+    # Per worker. Agent threads mostly wait on Google Maps, so this bounds concurrent requests
+    # rather than CPU use: by Little's law, 32 threads at ~250 ms per upstream-bound request
+    # sustain ~128 req/s per worker before requests queue (see executor_queue_depth).
+    AGENT_EXECUTOR_THREADS = int(os.getenv("AGENT_EXECUTOR_THREADS", 32))
+    DRAIN_TIMEOUT_SECONDS = int(os.getenv("DRAIN_TIMEOUT_SECONDS", 10))
+    SUPERVISOR_HEARTBEAT_URL = os.getenv("SUPERVISOR_HEARTBEAT_URL", SUPERVISOR_URL.rsplit("/", 1)[0] + "/heartbeat")
+    SUPERVISOR_ENABLED = os.getenv("SUPERVISOR_ENABLED", "true").lower() in ("1", "true", "yes")
+    SUPERVISOR_TIMEOUT = float(os.getenv("SUPERVISOR_TIMEOUT", 3.0))
+    REGISTRATION_MAX_ATTEMPTS = int(os.getenv("REGISTRATION_MAX_ATTEMPTS", 5))
+    REGISTRATION_BACKOFF_SECONDS = float(os.getenv("REGISTRATION_BACKOFF_SECONDS", 1.0))
+    REGISTRATION_MAX_BACKOFF_SECONDS = float(os.getenv("REGISTRATION_MAX_BACKOFF_SECONDS", 30.0))
+    HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("HEARTBEAT_INTERVAL_SECONDS", 15.0))
+    REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", 5.0))
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 50))
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))
+    BATCH_TIMEOUT_SECONDS = float(os.getenv("BATCH_TIMEOUT_SECONDS", 10.0))
+    GEOMETRY_MAX_POINTS = int(os.getenv("GEOMETRY_MAX_POINTS", 200))
+    BIKE_MAX_DISTANCE_METERS = int(os.getenv("BIKE_MAX_DISTANCE_METERS", 25000))
+    TRANSIT_MIN_DISTANCE_METERS = int(os.getenv("TRANSIT_MIN_DISTANCE_METERS", 500))
+    MODE_MAX_EMPTY_RESULTS = int(os.getenv("MODE_MAX_EMPTY_RESULTS", 3))
+    CORRIDOR_TTL_SECONDS = float(os.getenv("CORRIDOR_TTL_SECONDS", 86400))
+    MODE_EMPTY_STREAK_TTL_SECONDS = float(os.getenv("MODE_EMPTY_STREAK_TTL_SECONDS", 1800))
+    CORRIDOR_MAX_ENTRIES = int(os.getenv("CORRIDOR_MAX_ENTRIES", 10000))
+    INCIDENT_TTL_SECONDS = float(os.getenv("INCIDENT_TTL_SECONDS", 1800))
+    INCIDENT_RADIUS_METERS = float(os.getenv("INCIDENT_RADIUS_METERS", 500))
+    INCIDENT_GRID_DEGREES = float(os.getenv("INCIDENT_GRID_DEGREES", 0.01))
+    INCIDENT_MAX_ENTRIES = int(os.getenv("INCIDENT_MAX_ENTRIES", 10000))
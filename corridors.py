@@ -0,0 +1,52 @@
+import threading
+from typing import Optional, Tuple
+from config import Config
+from expiring import ExpiringDict
+
+def _corridor_key(origin: str, destination: str) -> Tuple[str, str]:
+    return (origin.strip().lower(), destination.strip().lower())
+
+class CorridorStats:
+    """
+    Remembers per-corridor (origin, destination) facts from past Directions responses:
+    the driving distance and, per travel mode, how many lookups in a row came back empty.
+    Used to skip upstream calls for modes that cannot be useful on a corridor.
+    Empty-result streaks expire much sooner than distances, because transit availability
+    depends on the time of day; an expired streak lets the mode be queried again.
+    """
+    def __init__(self, ttl_seconds: float = None, streak_ttl_seconds: float = None, max_entries: int = None):
+        max_entries = max_entries or Config.CORRIDOR_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._distances = ExpiringDict(ttl_seconds or Config.CORRIDOR_TTL_SECONDS, max_entries)
+        self._empty_streaks = ExpiringDict(streak_ttl_seconds or Config.MODE_EMPTY_STREAK_TTL_SECONDS, max_entries)
+        self.calls_saved = 0
+
+    def record_distance(self, origin: str, destination: str, meters: int, now: Optional[float] = None):
+        with self._lock:
+            self._distances.set(_corridor_key(origin, destination), meters, now)
+
+    def distance(self, origin: str, destination: str, now: Optional[float] = None) -> Optional[int]:
+        """Cached driving distance in meters, or None if unknown or expired."""
+        with self._lock:
+            return self._distances.get(_corridor_key(origin, destination), now)
+
+    def record_outcome(self, origin: str, destination: str, mode: str, available: bool, now: Optional[float] = None):
+        """Record whether a lookup for this mode returned any route."""
+        key = _corridor_key(origin, destination) + (mode,)
+        with self._lock:
+            if available:
+                self._empty_streaks.pop(key)
+                return
+            count = self._empty_streaks.get(key, now) or 0
+            self._empty_streaks.set(key, count + 1, now)
+
+    def empty_streak(self, origin: str, destination: str, mode: str, now: Optional[float] = None) -> int:
+        """Number of consecutive recent lookups for this mode that returned no route."""
+        with self._lock:
+            return self._empty_streaks.get(_corridor_key(origin, destination) + (mode,), now) or 0
+
+    def record_pruned(self, calls: int = 1):
+        with self._lock:
+            self.calls_saved += calls
+
+corridor_stats = CorridorStats()
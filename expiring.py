@@ -0,0 +1,50 @@
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class ExpiringDict:
+    """
+    Dict whose entries expire ttl_seconds after they were last set, holding at most max_entries.
+    Every entry has the same TTL, so insertion order is expiry order: expired entries are always
+    at the front and each set/get/sweep only pops from there (amortized O(1)).
+    When full, the entry closest to expiry is evicted. Not thread-safe; callers hold their own lock.
+    """
+    def __init__(self, ttl_seconds: float, max_entries: int, on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+
+    def _pop_front(self):
+        key = next(iter(self._entries))
+        value, _ = self._entries.pop(key)
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def sweep(self, now: Optional[float] = None):
+        """Drop every expired entry."""
+        now = time.time() if now is None else now
+        while self._entries and next(iter(self._entries.values()))[1] <= now:
+            self._pop_front()
+
+    def set(self, key: Hashable, value: Any, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        # Re-insert so the entry moves to the back, keeping insertion order equal to expiry order
+        self._entries.pop(key, None)
+        self._entries[key] = (value, now + self.ttl_seconds)
+        self.sweep(now)
+        while len(self._entries) > self.max_entries:
+            self._pop_front()
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Any:
+        """Value for key, or None if missing or expired."""
+        now = time.time() if now is None else now
+        self.sweep(now)
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else default
+
+    def __len__(self) -> int:
+        return len(self._entries)
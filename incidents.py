@@ -0,0 +1,194 @@
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config import Config
+from expiring import ExpiringDict
+
+EARTH_RADIUS_METERS = 6371000.0
+METERS_PER_DEGREE = 111320.0
+# Above this many route cells, scan the occupied cells instead of enumerating the route's
+ROUTE_CELL_LIMIT = 50000
+CELL_KEY_OFFSET = 1 << 31
+# Candidates compared against all route segments per array op
+CANDIDATE_CHUNK = 256
+# Incidents are identified by their text at a location rounded to ~11 m
+LOCATION_DECIMALS = 4
+
+class Incident:
+    def __init__(self, text: str, lat: float, lng: float):
+        self.text = text
+        self.lat = lat
+        self.lng = lng
+
+def _distance_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points (haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+def _segment_distances_meters(lats: np.ndarray, lngs: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    (C, S) distances from C points to S segments a-b, each point using a local
+    equirectangular projection centred on itself.
+    """
+    kx = (METERS_PER_DEGREE * np.cos(np.radians(lats)))[:, None]
+    ax, ay = (a[None, :, 1] - lngs[:, None]) * kx, (a[None, :, 0] - lats[:, None]) * METERS_PER_DEGREE
+    bx, by = (b[None, :, 1] - lngs[:, None]) * kx, (b[None, :, 0] - lats[:, None]) * METERS_PER_DEGREE
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    t = np.clip(-(ax * dx + ay * dy) / np.where(length_sq == 0, 1.0, length_sq), 0.0, 1.0)
+    return np.hypot(ax + t * dx, ay + t * dy)
+
+class IncidentIndex:
+    """
+    In-memory spatial index of traffic incidents seen in Directions responses.
+    Incidents are bucketed into a lat/lng grid and expire after a TTL.
+    Also remembers the location and last traffic status of places the agent has routed through,
+    so traffic questions about a known place can be answered without an upstream call.
+    Both stores are swept as they are used and capped at INCIDENT_MAX_ENTRIES.
+    """
+    def __init__(self, cell_degrees: float = None, ttl_seconds: float = None, max_entries: int = None):
+        self.cell_degrees = cell_degrees or Config.INCIDENT_GRID_DEGREES
+        self.ttl_seconds = ttl_seconds or Config.INCIDENT_TTL_SECONDS
+        max_entries = max_entries or Config.INCIDENT_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._cells: Dict[Tuple[int, int], Dict[Tuple[Tuple[float, float], str], Incident]] = {}
+        self._incidents = ExpiringDict(self.ttl_seconds, max_entries, on_evict=self._remove_from_cell)
+        self._places = ExpiringDict(self.ttl_seconds, max_entries)
+        self.place_lookups = 0
+        self.place_hits = 0
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def _remove_from_cell(self, key: Tuple[Tuple[float, float], str], incident: Incident):
+        cell = self._cell(*key[0])
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    @staticmethod
+    def _padding_degrees(lat: float, radius_meters: float) -> Tuple[float, float]:
+        dlat = radius_meters / METERS_PER_DEGREE
+        dlng = radius_meters / (METERS_PER_DEGREE * max(0.01, math.cos(math.radians(lat))))
+        return dlat, dlng
+
+    def add(self, text: str, lat: float, lng: float, now: Optional[float] = None):
+        """
+        Add an incident, or refresh its expiry if the same text was already reported at this location.
+        The same text elsewhere, even in the same cell, is a separate incident.
+        """
+        spot = (round(lat, LOCATION_DECIMALS), round(lng, LOCATION_DECIMALS))
+        key = (spot, text)
+        incident = Incident(text, lat, lng)
+        with self._lock:
+            # Cell from the rounded location, so a refresh always lands in the same bucket
+            self._cells.setdefault(self._cell(*spot), {})[key] = incident
+            self._incidents.set(key, incident, now)
+
+    def near(self, lat: float, lng: float, radius_meters: float = None, now: Optional[float] = None) -> List[Incident]:
+        """Incidents within radius_meters of a point, nearest first."""
+        radius_meters = radius_meters or Config.INCIDENT_RADIUS_METERS
+        dlat, dlng = self._padding_degrees(lat, radius_meters)
+        lat0, lng0 = self._cell(lat - dlat, lng - dlng)
+        lat1, lng1 = self._cell(lat + dlat, lng + dlng)
+        scored = []
+        with self._lock:
+            self._incidents.sweep(now)
+            for i in range(lat0, lat1 + 1):
+                for j in range(lng0, lng1 + 1):
+                    for incident in self._cells.get((i, j), {}).values():
+                        distance = _distance_meters(lat, lng, incident.lat, incident.lng)
+                        if distance <= radius_meters:
+                            scored.append((distance, incident))
+        scored.sort(key=lambda item: item[0])
+        return [incident for _, incident in scored]
+
+    def _route_candidates(self, a: np.ndarray, b: np.ndarray, radius_meters: float) -> List[Incident]:
+        """Incidents in any grid cell covered by a segment's bounding box padded by the radius. Caller holds the lock."""
+        dlat = radius_meters / METERS_PER_DEGREE
+        max_abs_lat = np.maximum(np.abs(a[:, 0]), np.abs(b[:, 0]))
+        dlng = radius_meters / (METERS_PER_DEGREE * np.maximum(0.01, np.cos(np.radians(max_abs_lat))))
+        i0 = np.floor((np.minimum(a[:, 0], b[:, 0]) - dlat) / self.cell_degrees).astype(np.int64)
+        i1 = np.floor((np.maximum(a[:, 0], b[:, 0]) + dlat) / self.cell_degrees).astype(np.int64)
+        j0 = np.floor((np.minimum(a[:, 1], b[:, 1]) - dlng) / self.cell_degrees).astype(np.int64)
+        j1 = np.floor((np.maximum(a[:, 1], b[:, 1]) + dlng) / self.cell_degrees).astype(np.int64)
+        widths = j1 - j0 + 1
+        counts = (i1 - i0 + 1) * widths
+        total = int(counts.sum())
+        if total > ROUTE_CELL_LIMIT or total > 4 * len(self._cells):
+            # Few occupied cells (or a huge route): test each occupied cell against every segment box
+            occupied = list(self._cells)
+            cells = np.array(occupied, dtype=np.int64).reshape(-1, 2)
+            inside = ((cells[:, None, 0] >= i0) & (cells[:, None, 0] <= i1) &
+                      (cells[:, None, 1] >= j0) & (cells[:, None, 1] <= j1)).any(axis=1)
+            hits = [occupied[k] for k in np.flatnonzero(inside)]
+        else:
+            segment_ids = np.repeat(np.arange(len(counts)), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            rows = i0[segment_ids] + offsets // widths[segment_ids]
+            cols = j0[segment_ids] + offsets % widths[segment_ids]
+            # Pack (row, col) into one int64 so unique is a flat sort
+            keys = np.unique((rows << 32) + (cols + CELL_KEY_OFFSET))
+            route_cells = zip((keys >> 32).tolist(), ((keys & 0xffffffff) - CELL_KEY_OFFSET).tolist())
+            hits = [cell for cell in route_cells if cell in self._cells]
+        return [incident for cell in hits for incident in self._cells[cell].values()]
+
+    def along_route(self, points: Sequence[Tuple[float, float]], radius_meters: float = None,
+                    now: Optional[float] = None) -> List[Incident]:
+        """Incidents within radius_meters of a route polyline, in route order."""
+        if len(points) == 0:
+            return []
+        if len(points) == 1:
+            return self.near(points[0][0], points[0][1], radius_meters, now)
+        radius_meters = radius_meters or Config.INCIDENT_RADIUS_METERS
+        route = np.asarray(points, dtype=float)
+        a, b = route[:-1], route[1:]
+        with self._lock:
+            self._incidents.sweep(now)
+            if not self._cells:
+                return []
+            candidates = self._route_candidates(a, b, radius_meters)
+        found = []
+        for start in range(0, len(candidates), CANDIDATE_CHUNK):
+            chunk = candidates[start:start + CANDIDATE_CHUNK]
+            lats = np.array([incident.lat for incident in chunk])
+            lngs = np.array([incident.lng for incident in chunk])
+            within = _segment_distances_meters(lats, lngs, a, b) <= radius_meters
+            first_segment = np.argmax(within, axis=1)
+            for k in np.flatnonzero(within.any(axis=1)):
+                found.append((first_segment[k], chunk[k]))
+        found.sort(key=lambda item: item[0])
+        return [incident for _, incident in found]
+
+    def record_place(self, name: str, lat: float, lng: float, status: str, now: Optional[float] = None):
+        """Remember where a named place is and the traffic status last observed there."""
+        with self._lock:
+            self._places.set(name.strip().lower(), (lat, lng, status), now)
+
+    def lookup_place(self, name: str, now: Optional[float] = None) -> Optional[Tuple[float, float, str]]:
+        """Return (lat, lng, status) for a known place, or None if unknown or expired."""
+        with self._lock:
+            self.place_lookups += 1
+            entry = self._places.get(name.strip().lower(), now)
+            if entry is not None:
+                self.place_hits += 1
+            return entry
+
+    def place_hit_rate(self) -> Optional[float]:
+        """Share of place lookups answered from memory, i.e. traffic queries that skipped the upstream call."""
+        with self._lock:
+            if not self.place_lookups:
+                return None
+            return round(self.place_hits / self.place_lookups, 3)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._incidents)
+
+incident_index = IncidentIndex()
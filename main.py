@@ -1,19 +1,110 @@
 from fastapi import FastAPI
-from models import AgentRequest, AgentResponse, Status
+from models import AgentRequest, AgentResponse, BatchAgentRequest, BatchAgentResponse, Status
 from agent_graph import app_graph
-from registry import register_agent
+from commuter_agent import DirectionsMemo, directions_memo
+from corridors import corridor_stats
+from incidents import incident_index
+from registry import announce_draining, run_supervisor_link
+from metrics import metrics
 from config import Config
 import uvicorn
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 import asyncio
+import contextvars
+import signal
+import threading
+import time
 from utils import logger
 
+# Dedicated, explicitly sized pool for agent graph calls; created per worker process in lifespan
+agent_executor = None
+# Final "draining" heartbeat, started by the first shutdown signal
+drain_task = None
+# Agent calls submitted to agent_executor that have not finished (queued or running)
+agent_calls_pending = 0
+_pending_lock = threading.Lock()
+
+def _agent_call_finished(future=None):
+    """Done callback of an agent call; also runs for calls cancelled before they started."""
+    global agent_calls_pending
+    with _pending_lock:
+        agent_calls_pending -= 1
+
+def _executor_queue_depth():
+    """Number of agent calls waiting for a free thread in the agent executor."""
+    return max(0, agent_calls_pending - Config.AGENT_EXECUTOR_THREADS)
+
+async def _run_agent(inputs):
+    """
+    Run the agent graph on the agent executor, carrying over context variables
+    (such as the batch Directions memo) like asyncio.to_thread does.
+    Calls are counted until their thread finishes, even if the request timed out first.
+    """
+    global agent_calls_pending
+    if agent_executor is None:
+        return await asyncio.to_thread(app_graph.invoke, inputs)
+    context = contextvars.copy_context()
+    with _pending_lock:
+        agent_calls_pending += 1
+    try:
+        future = agent_executor.submit(context.run, app_graph.invoke, inputs)
+    except Exception:
+        _agent_call_finished()
+        raise
+    future.add_done_callback(_agent_call_finished)
+    return await asyncio.wrap_future(future)
+
+def _begin_draining(supervisor_task: asyncio.Task):
+    """Stop heartbeats and tell the Supervisor this worker is going away. Safe to call more than once."""
+    global drain_task
+    if drain_task is None:
+        supervisor_task.cancel()
+        drain_task = asyncio.ensure_future(announce_draining())
+
+def _install_drain_hook(supervisor_task: asyncio.Task):
+    """
+    Chain onto uvicorn's SIGINT/SIGTERM handlers. Uvicorn closes the listener and waits for open
+    connections before running lifespan shutdown, so the Supervisor has to be told here,
+    while those requests are still finishing, not after.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(_begin_draining, supervisor_task)
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(sig, handler)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    register_agent()
+    global agent_executor, drain_task
+    # Startup: register and heartbeat in the background so startup is not blocked
+    drain_task = None
+    agent_executor = ThreadPoolExecutor(
+        max_workers=Config.AGENT_EXECUTOR_THREADS,
+        thread_name_prefix="agent"
+    )
+    metrics.register_signal("agent_calls_pending", lambda: agent_calls_pending)
+    metrics.register_signal("executor_queue_depth", _executor_queue_depth)
+    metrics.register_signal("executor_threads", lambda: Config.AGENT_EXECUTOR_THREADS)
+    metrics.register_signal("cache_hit_rate", incident_index.place_hit_rate)
+    metrics.register_signal("upstream_calls_saved", lambda: corridor_stats.calls_saved)
+    supervisor_task = asyncio.create_task(run_supervisor_link())
+    _install_drain_hook(supervisor_task)
     yield
-    # Shutdown
+    # Shutdown: uvicorn has already drained connections (up to DRAIN_TIMEOUT_SECONDS).
+    # Without a signal (e.g. in tests) the Supervisor is told now instead.
+    _begin_draining(supervisor_task)
+    await asyncio.gather(supervisor_task, drain_task, return_exceptions=True)
+    # Agent threads of requests that already timed out finish on their own; queued work is dropped
+    agent_executor.shutdown(wait=False, cancel_futures=True)
+    agent_executor = None
 
 app = FastAPI(title=Config.AGENT_NAME, lifespan=lifespan)
 
@@ -28,7 +119,8 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
-            "agent": "/commuter-agent"
+            "agent": "/commuter-agent",
+            "batch": "/commuter-agent/batch"
         },
         "description": "AI Commuter Assistance Agent - Provides route planning, traffic updates, and travel mode suggestions"
     }
@@ -76,6 +168,17 @@ async def agent_endpoint(request: AgentRequest):
     Main endpoint for commuter agent. Accepts messages and returns structured response.
     Always returns JSON, never crashes.
     """
+    started_at = time.perf_counter()
+    metrics.request_started()
+    try:
+        return await _process_agent_request(request)
+    finally:
+        metrics.request_finished(started_at)
+
+async def _process_agent_request(request: AgentRequest, timeout: float = Config.REQUEST_TIMEOUT_SECONDS) -> AgentResponse:
+    """
+    Run one unified request through the agent graph and wrap the result in an AgentResponse.
+    """
     try:
         # Validate input
         if not request.messages:
@@ -88,7 +191,10 @@ async def agent_endpoint(request: AgentRequest):
         
         # Convert messages to dict format
         try:
-            inputs = {"messages": [m.dict() for m in request.messages]}
+            inputs = {
+                "messages": [m.dict() for m in request.messages],
+                "options": request.options.dict() if request.options else {}
+            }
         except Exception as e:
             logger.error(f"Error converting messages: {e}")
             return AgentResponse(
@@ -98,11 +204,11 @@ async def agent_endpoint(request: AgentRequest):
                 error_message=f"Invalid message format: {str(e)}"
             )
         
-        # Process with timeout (5 seconds)
+        # Process with timeout
         try:
             result = await asyncio.wait_for(
-                asyncio.to_thread(app_graph.invoke, inputs),
-                timeout=5.0
+                _run_agent(inputs),
+                timeout=timeout
             )
             
             # Extract response from result
@@ -163,6 +269,67 @@ async def agent_endpoint(request: AgentRequest):
             error_message=f"Internal error: {str(e)}"
         )
 
+async def _run_batch_item(request: AgentRequest, deadline: float, semaphore: asyncio.Semaphore) -> AgentResponse:
+    """
+    Run one batch item within the batch's remaining time budget.
+    """
+    async with semaphore:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            return AgentResponse(
+                agent_name="commuter-agent",
+                status=Status.ERROR,
+                data=None,
+                error_message="Request processing timed out"
+            )
+        started_at = time.perf_counter()
+        metrics.request_started()
+        try:
+            # Each item keeps the single-request timeout; the batch deadline can only shorten it
+            return await _process_agent_request(request, timeout=min(Config.REQUEST_TIMEOUT_SECONDS, remaining))
+        finally:
+            metrics.request_finished(started_at)
+
+@app.post("/commuter-agent/batch", response_model=BatchAgentResponse)
+async def batch_endpoint(batch: BatchAgentRequest):
+    """
+    Batch endpoint. Runs many unified requests concurrently under one shared deadline.
+    Directions lookups for the same origin, destination and mode across the batch are made only once.
+    Results come back in request order; a failing item does not fail the batch.
+    """
+    if not batch.requests:
+        return BatchAgentResponse(
+            agent_name="commuter-agent",
+            status=Status.ERROR,
+            error_message="No requests provided"
+        )
+    if len(batch.requests) > Config.BATCH_MAX_ITEMS:
+        return BatchAgentResponse(
+            agent_name="commuter-agent",
+            status=Status.ERROR,
+            error_message=f"Batch too large: {len(batch.requests)} requests, maximum is {Config.BATCH_MAX_ITEMS}"
+        )
+
+    deadline = asyncio.get_running_loop().time() + Config.BATCH_TIMEOUT_SECONDS
+    semaphore = asyncio.Semaphore(Config.BATCH_MAX_CONCURRENCY)
+    memo = DirectionsMemo()
+    # Tasks and worker threads copy the current context, so every item sees this memo
+    token = directions_memo.set(memo)
+    try:
+        results = await asyncio.gather(
+            *(_run_batch_item(item, deadline, semaphore) for item in batch.requests)
+        )
+    finally:
+        directions_memo.reset(token)
+
+    logger.info(f"Processed batch of {len(results)} requests, {memo.deduplicated}/{memo.lookups} Directions lookups deduplicated")
+    return BatchAgentResponse(
+        agent_name="commuter-agent",
+        status=Status.SUCCESS,
+        results=list(results),
+        error_message=None
+    )
+
 @app.get("/health")
 def health_check():
     """
@@ -175,4 +342,12 @@ def health_check():
     }
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host=Config.API_HOST, port=Config.API_PORT, reload=True)
+    uvicorn.run(
+        "main:app",
+        host=Config.API_HOST,
+        port=Config.API_PORT,
+        # reload and multiple workers are mutually exclusive in uvicorn
+        reload=Config.RELOAD,
+        workers=None if Config.RELOAD else Config.WORKERS,
+        timeout_graceful_shutdown=Config.DRAIN_TIMEOUT_SECONDS
+    )
@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+class LoadMetrics:
+    def __init__(self, window_size: int = 200):
+        """Track live load signals reported to the Supervisor in heartbeats."""
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies = deque(maxlen=window_size)
+        self._signals: Dict[str, Callable[[], Any]] = {}
+
+    def request_started(self):
+        """Mark the start of a request."""
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self, started_at: float):
+        """Mark the end of a request started at the given perf_counter time."""
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._latencies.append(elapsed_ms)
+
+    def register_signal(self, name: str, provider: Callable[[], Any]):
+        """
+        Register a callable whose value is included in every snapshot.
+        Used by components (caches, breakers, executors) to report their state.
+        """
+        with self._lock:
+            self._signals[name] = provider
+
+    def p95_latency_ms(self) -> Optional[float]:
+        """95th percentile latency over the recent window, or None if no requests yet."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))
+        return round(samples[index], 2)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current capacity signals as a JSON-serializable dict."""
+        with self._lock:
+            in_flight = self._in_flight
+            signals = dict(self._signals)
+        data = {
+            "in_flight_requests": in_flight,
+            "p95_latency_ms": self.p95_latency_ms(),
+            "executor_queue_depth": None,
+            "cache_hit_rate": None,
+            "circuit_breaker_state": None,
+        }
+        for name, provider in signals.items():
+            try:
+                data[name] = provider()
+            except Exception:
+                data[name] = None
+        return data
+
+metrics = LoadMetrics()
@@ -21,5 +21,19 @@ class Message(BaseModel):
     role: Role
     content: str
 
+class RequestOptions(BaseModel):
+    include_geometry: bool = False
+    geometry_tolerance_meters: float = 10.0
+
 class AgentRequest(BaseModel):
     messages: List[Message]
+    options: Optional[RequestOptions] = None
+
+class BatchAgentRequest(BaseModel):
+    requests: List[AgentRequest]
+
+class BatchAgentResponse(BaseModel):
+    agent_name: str
+    status: Status
+    results: List[AgentResponse] = []
+    error_message: Optional[str] = None
@@ -0,0 +1,126 @@
+from typing import List, Tuple
+import numpy as np
+
+METERS_PER_DEGREE = 111320.0
+
+def decode_polyline_array(encoded: str) -> np.ndarray:
+    """
+    Decode a Google encoded polyline into an (N, 2) array of (lat, lng).
+    Vectorized: chunk boundaries, varint reassembly, zigzag and delta decoding are all array ops.
+    Raises ValueError for malformed input: characters outside '?'..'~', a truncated final value,
+    or an odd number of values.
+    """
+    if not encoded:
+        return np.empty((0, 2))
+    chunks = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    if chunks.min() < 0 or chunks.max() > 0x3f:
+        raise ValueError("Invalid polyline: character outside the encoding alphabet")
+    ends = chunks < 0x20
+    if not ends[-1]:
+        raise ValueError("Invalid polyline: truncated final value")
+    # Index of the value each chunk belongs to, and the chunk's position within that value
+    value_ids = np.concatenate(([0], np.cumsum(ends[:-1])))
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    positions = np.arange(len(chunks)) - starts[value_ids]
+    values = np.add.reduceat((chunks & 0x1f) << (5 * positions), starts)
+    values = (values >> 1) ^ -(values & 1)
+    if len(values) % 2:
+        raise ValueError("Invalid polyline: odd number of coordinate values")
+    return np.cumsum(values.reshape(-1, 2), axis=0) / 1e5
+
+def decode_polyline(encoded: str) -> List[Tuple[float, float]]:
+    """
+    Decode a Google encoded polyline into a list of (lat, lng) points.
+    """
+    return [tuple(point) for point in decode_polyline_array(encoded).tolist()]
+
+def encode_polyline(points: np.ndarray) -> str:
+    """
+    Encode an (N, 2) array of (lat, lng) as a Google encoded polyline.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) == 0:
+        return ""
+    scaled = np.round(points * 1e5).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = (deltas << 1) ^ (deltas >> 63)
+    # Split every value into up to 7 five-bit chunks; keep only the significant ones
+    shifts = 5 * np.arange(7)
+    chunks = (values[:, None] >> shifts) & 0x1f
+    lengths = 1 + np.count_nonzero((values[:, None] >> shifts[1:]) > 0, axis=1)
+    keep = np.arange(7) < lengths[:, None]
+    more = np.arange(7) < (lengths - 1)[:, None]
+    chunks = (chunks | (more * 0x20)) + 63
+    return chunks[keep].astype(np.uint8).tobytes().decode("ascii")
+
+def _to_meters(points: np.ndarray) -> np.ndarray:
+    """Project (lat, lng) to local planar meters (equirectangular around the mean latitude)."""
+    scale = np.array([METERS_PER_DEGREE, METERS_PER_DEGREE * np.cos(np.radians(points[:, 0].mean()))])
+    return points * scale
+
+def _significance(xy: np.ndarray, tolerance_meters: float) -> np.ndarray:
+    """
+    Run Douglas-Peucker down to tolerance_meters, recording for every kept point its significance
+    (its split distance, capped by its parent's).
+    Simplifying at any coarser tolerance keeps exactly the points whose significance exceeds it.
+    All open segments are split together in each pass, so the work is a handful of array ops per tree level.
+    """
+    n = len(xy)
+    significance = np.zeros(n)
+    significance[[0, -1]] = np.inf
+    firsts, lasts, parents = np.array([0]), np.array([n - 1]), np.array([np.inf])
+    while len(firsts):
+        counts = lasts - firsts - 1
+        open_segments = counts > 0
+        firsts, lasts, parents, counts = firsts[open_segments], lasts[open_segments], parents[open_segments], counts[open_segments]
+        if not len(firsts):
+            break
+        # Every interior point of every open segment, tagged with its segment
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        segment_ids = np.repeat(np.arange(len(firsts)), counts)
+        indices = np.arange(counts.sum()) - offsets[segment_ids] + firsts[segment_ids] + 1
+        a, b = xy[firsts][segment_ids], xy[lasts][segment_ids]
+        ab = b - a
+        length_sq = np.einsum("ij,ij->i", ab, ab)
+        t = np.clip(np.einsum("ij,ij->i", xy[indices] - a, ab) / np.where(length_sq == 0, 1.0, length_sq), 0.0, 1.0)
+        distances = np.linalg.norm(xy[indices] - (a + t[:, None] * ab), axis=1)
+        # Farthest point per segment (first one on ties)
+        farthest = np.maximum.reduceat(distances, offsets)
+        positions = np.where(distances == farthest[segment_ids], np.arange(len(distances)), len(distances))
+        splits = indices[np.minimum.reduceat(positions, offsets)]
+        split_more = farthest > tolerance_meters
+        firsts, lasts, parents = firsts[split_more], lasts[split_more], parents[split_more]
+        splits, farthest = splits[split_more], farthest[split_more]
+        significance[splits] = np.minimum(farthest, parents)
+        firsts, lasts = np.concatenate((firsts, splits)), np.concatenate((splits, lasts))
+        parents = np.tile(significance[splits], 2)
+    return significance
+
+def simplify_polyline(points: np.ndarray, tolerance_meters: float, max_points: int = None) -> Tuple[np.ndarray, float]:
+    """
+    Douglas-Peucker simplification; each split computes all interior distances in one array op.
+    If more than max_points survive, the tolerance is raised to the smallest value that keeps at most max_points,
+    so the result is always exactly Douglas-Peucker at the returned tolerance.
+    Returns the simplified points and that tolerance.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 3:
+        return points, tolerance_meters
+    significance = _significance(_to_meters(points), max(tolerance_meters, 0.0))
+    if max_points is not None and np.count_nonzero(significance > tolerance_meters) > max_points:
+        # The (max_points + 1)-th largest significance; endpoints are infinite, so this is finite
+        tolerance_meters = float(-np.partition(-significance, max(2, max_points))[max(2, max_points)])
+    return points[significance > tolerance_meters], tolerance_meters
+
+def route_geometry(encoded: str, tolerance_meters: float, max_points: int) -> dict:
+    """
+    Decode, simplify and re-encode a route polyline with at most max_points points.
+    """
+    points = decode_polyline_array(encoded)
+    simplified, tolerance_meters = simplify_polyline(points, tolerance_meters, max_points)
+    return {
+        "polyline": encode_polyline(simplified),
+        "points": len(simplified),
+        "original_points": len(points),
+        "tolerance_meters": round(tolerance_meters, 1)
+    }
@@ -1,24 +1,168 @@
+import asyncio
+import os
+import socket
+from typing import Optional
 import requests
 from config import Config
+from metrics import metrics
 from utils import logger
 
-def register_agent():
+# Set once this worker has registered; a worker that never registered has nothing to announce
+registered = False
+# Supervisor request currently running in a worker thread. Cancelling the caller does not stop
+# the thread, so announce_draining waits for this before sending "draining".
+_outbound: Optional[asyncio.Future] = None
+
+async def _call_supervisor(func, *args):
+    """Run a blocking Supervisor request in a thread, tracked in _outbound and shielded from cancellation."""
+    global _outbound
+    _outbound = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    return await asyncio.shield(_outbound)
+
+def _identity():
     """
-    Registers the agent with the Supervisor.
+    Identity of this worker process. Every worker of a replica registers separately under the
+    same agent_id and api_url; replica_id groups them and instance_id tells them apart.
+    Load in a heartbeat is per instance, so the Supervisor sums it over a replica's instances.
     """
-    payload = {
+    replica_id = f"{socket.gethostname()}:{Config.API_PORT}"
+    return {
         "agent_id": Config.AGENT_ID,
         "agent_name": Config.AGENT_NAME,
+        "replica_id": replica_id,
+        "instance_id": f"{replica_id}:{os.getpid()}",
+        "workers": Config.WORKERS
+    }
+
+def _registration_payload():
+    """Build the registration payload sent to the Supervisor."""
+    return {
+        **_identity(),
         "api_url": f"http://{Config.API_HOST}:{Config.API_PORT}/commuter-agent",
         "capabilities": ["route_planning", "traffic_updates", "travel_mode_suggestion", "commute_optimization", "navigation_assistance"],
         "status": "active"
     }
+
+def _heartbeat_payload(status: str = "active"):
+    """Build the heartbeat payload with live capacity signals."""
+    return {
+        **_identity(),
+        "status": status,
+        "load": metrics.snapshot()
+    }
+
+def register_agent():
+    """
+    Registers this worker with the Supervisor. Raises on failure.
+    """
+    global registered
+    logger.info(f"Attempting to register agent at {Config.SUPERVISOR_URL}")
+    response = requests.post(
+        Config.SUPERVISOR_URL,
+        json=_registration_payload(),
+        timeout=Config.SUPERVISOR_TIMEOUT
+    )
+    response.raise_for_status()
+    registered = True
+    logger.info("Agent registered successfully.")
+
+def send_heartbeat(status: str = "active"):
+    """
+    Sends one heartbeat to the Supervisor. Raises on failure.
+    """
+    response = requests.post(
+        Config.SUPERVISOR_HEARTBEAT_URL,
+        json=_heartbeat_payload(status),
+        timeout=Config.SUPERVISOR_TIMEOUT
+    )
+    response.raise_for_status()
+
+# Heartbeat responses meaning the Supervisor no longer knows this agent and it must register again
+REREGISTER_STATUS_CODES = (404, 410)
+
+async def register_with_retry():
+    """
+    Register with the Supervisor, retrying with exponential backoff until it succeeds.
+    Runs in the background, so a Supervisor that comes up late still gets a registration.
+    Failures are logged for the first REGISTRATION_MAX_ATTEMPTS attempts, then once more as an error.
+    """
+    delay = Config.REGISTRATION_BACKOFF_SECONDS
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            await _call_supervisor(register_agent)
+            return
+        except Exception as e:
+            if attempt < Config.REGISTRATION_MAX_ATTEMPTS:
+                logger.warning(f"Registration attempt {attempt} failed: {e}")
+            elif attempt == Config.REGISTRATION_MAX_ATTEMPTS:
+                logger.error(f"Registration attempt {attempt} failed: {e}; retrying every {Config.REGISTRATION_MAX_BACKOFF_SECONDS}s or less in the background")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, Config.REGISTRATION_MAX_BACKOFF_SECONDS)
+
+async def heartbeat_loop():
+    """
+    Send heartbeats every HEARTBEAT_INTERVAL_SECONDS until cancelled.
+    Returns when the Supervisor rejects a heartbeat as coming from an unknown agent, so the caller can re-register.
+    Other failures are logged once per outage so an unreachable Supervisor does not flood the logs.
+    """
+    healthy = True
+    while True:
+        await asyncio.sleep(Config.HEARTBEAT_INTERVAL_SECONDS)
+        try:
+            await _call_supervisor(send_heartbeat)
+            if not healthy:
+                logger.info("Supervisor heartbeat recovered")
+            healthy = True
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in REREGISTER_STATUS_CODES:
+                logger.warning("Supervisor does not recognise this agent, registering again")
+                return
+            if healthy:
+                logger.warning(f"Supervisor heartbeat failed: {e}")
+            healthy = False
+        except Exception as e:
+            if healthy:
+                logger.warning(f"Supervisor heartbeat failed: {e}")
+            healthy = False
+
+async def run_supervisor_link():
+    """
+    Background task started from the app lifespan: register, then heartbeat,
+    registering again whenever the Supervisor forgets this agent.
+    """
+    if not Config.SUPERVISOR_ENABLED:
+        logger.info("Supervisor registration disabled")
+        return
+    while True:
+        await register_with_retry()
+        if Config.HEARTBEAT_INTERVAL_SECONDS <= 0:
+            return
+        await heartbeat_loop()
+
+async def announce_draining():
+    """
+    Send a final "draining" heartbeat so the Supervisor stops routing to this worker.
+    Call after cancelling run_supervisor_link. A registration or "active" heartbeat still in
+    flight is waited for first (up to SUPERVISOR_TIMEOUT), so it cannot land after "draining";
+    whether to announce is decided after that wait, since the registration may just have succeeded.
+    Best effort: never raises.
+    """
+    if not Config.SUPERVISOR_ENABLED:
+        return
+    pending = _outbound
+    if pending is not None and not pending.done():
+        try:
+            await asyncio.wait_for(asyncio.shield(pending), timeout=Config.SUPERVISOR_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Supervisor request still in flight, announcing draining anyway")
+        except Exception:
+            pass  # It failed, so there is nothing left to overtake
+    if not registered:
+        return
     try:
-        logger.info(f"Attempting to register agent at {Config.SUPERVISOR_URL}")
-        # In a real scenario, we would uncomment the following lines:
-        # response = requests.post(Config.SUPERVISOR_URL, json=payload)
-        # response.raise_for_status()
-        # logger.info("Agent registered successfully.")
-        logger.info("Agent registration simulated (Supervisor URL not reachable in this env).")
+        await _call_supervisor(send_heartbeat, "draining")
+        logger.info("Told Supervisor this worker is draining")
     except Exception as e:
-        logger.error(f"Failed to register agent: {e}")
+        logger.warning(f"Failed to send draining heartbeat: {e}")
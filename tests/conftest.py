@@ -0,0 +1,27 @@
+import os
+import sys
+
+# Run offline: mock data instead of Google Maps, no Supervisor unless a test points at the stand-in
+os.environ["GOOGLE_MAPS_API_KEY"] = ""
+os.environ["SUPERVISOR_ENABLED"] = "false"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from stand_in_supervisor import StandInSupervisor
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    """A running stand-in Supervisor with the agent's Config pointed at it."""
+    from config import Config
+    server = StandInSupervisor().start()
+    monkeypatch.setattr(Config, "SUPERVISOR_ENABLED", True)
+    monkeypatch.setattr(Config, "SUPERVISOR_URL", f"{server.base_url}/register")
+    monkeypatch.setattr(Config, "SUPERVISOR_HEARTBEAT_URL", f"{server.base_url}/heartbeat")
+    monkeypatch.setattr(Config, "REGISTRATION_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(Config, "REGISTRATION_MAX_BACKOFF_SECONDS", 0.04)
+    monkeypatch.setattr(Config, "HEARTBEAT_INTERVAL_SECONDS", 0.02)
+    yield server
+    server.stop()
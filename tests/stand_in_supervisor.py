@@ -0,0 +1,106 @@
+"""
+Local stand-in for the Supervisor agent, for tests and manual runs.
+
+Accepts POST /register and POST /heartbeat, records every payload, and answers
+heartbeats from agents it has not seen register with 404 (like a restarted Supervisor).
+GET /agents returns what it has recorded.
+
+Run it next to the agent:
+    python tests/stand_in_supervisor.py --port 9000
+    SUPERVISOR_URL=http://localhost:9000/register python main.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StandInSupervisor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.lock = threading.Lock()
+        self.registrations = []
+        self.heartbeats = []
+        self.known_agents = set()
+        # Number of upcoming registrations to reject with 503
+        self.fail_registrations = 0
+        # Seconds the next request waits before it is handled, to hold it in flight
+        self.delay_next_seconds = 0.0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def forget_agents(self):
+        """Simulate a Supervisor restart: heartbeats are rejected until agents register again."""
+        with self.lock:
+            self.known_agents.clear()
+
+    def start(self) -> "StandInSupervisor":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def _identity(payload: dict) -> str:
+    return payload.get("instance_id") or payload.get("agent_id")
+
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        with server.lock:
+            delay, server.delay_next_seconds = server.delay_next_seconds, 0.0
+        time.sleep(delay)
+        with server.lock:
+            if self.path == "/register":
+                if server.fail_registrations > 0:
+                    server.fail_registrations -= 1
+                    self._reply(503, {"error": "unavailable"})
+                    return
+                server.registrations.append(payload)
+                server.known_agents.add(_identity(payload))
+                self._reply(200, {"registered": True})
+            elif self.path == "/heartbeat":
+                if _identity(payload) not in server.known_agents:
+                    self._reply(404, {"error": "unknown agent"})
+                    return
+                server.heartbeats.append(payload)
+                self._reply(200, {"ok": True})
+            else:
+                self._reply(404, {"error": "not found"})
+
+    def do_GET(self):
+        if self.path != "/agents":
+            self._reply(404, {"error": "not found"})
+            return
+        with self.server.lock:
+            self._reply(200, {
+                "registrations": self.server.registrations,
+                "heartbeats": self.server.heartbeats[-20:]
+            })
+
+    def log_message(self, format, *args):
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a stand-in Supervisor.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    supervisor = StandInSupervisor(args.host, args.port)
+    print(f"Stand-in Supervisor listening on {supervisor.base_url}")
+    supervisor.serve_forever()
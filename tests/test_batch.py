@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from commuter_agent import DirectionsMemo
+
+def test_memo_fetches_each_key_once_across_concurrent_items():
+    memo = DirectionsMemo()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return [{"legs": []}]
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: memo.get(("home", "downtown", "driving", ()), fetch), range(8)))
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert memo.lookups == 8
+    assert memo.deduplicated == 7
+
+def test_memo_keeps_different_keys_separate():
+    memo = DirectionsMemo()
+    assert memo.get(("a", "b", "driving", ()), lambda: "car") == "car"
+    assert memo.get(("a", "b", "transit", ()), lambda: "transit") == "transit"
+    assert memo.deduplicated == 0
+
+def test_memo_passes_exception_to_every_waiter():
+    memo = DirectionsMemo()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        raise RuntimeError("upstream failed")
+
+    def lookup(_):
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            memo.get(("home", "downtown", "driving", ()), fetch)
+        return True
+
+    with ThreadPoolExecutor(6) as pool:
+        assert all(pool.map(lookup, range(6)))
+    assert len(calls) == 1
+
+def test_batch_endpoint_returns_results_in_order_with_per_item_errors():
+    from fastapi.testclient import TestClient
+    import main
+
+    batch = {"requests": [
+        {"messages": [{"role": "user", "content": "best route to downtown"}]},
+        {"messages": [{"role": "system", "content": "no user message here"}]},
+        {"messages": [{"role": "user", "content": "what is the traffic like"}]},
+    ]}
+    with TestClient(main.app) as client:
+        body = client.post("/commuter-agent/batch", json=batch).json()
+
+    assert body["status"] == "success"
+    results = body["results"]
+    assert [r["status"] for r in results] == ["success", "error", "success"]
+    assert results[0]["data"]["message"]["type"] == "route_recommendation"
+    assert results[1]["error_message"] == "No user message found in messages"
+    assert results[2]["data"]["message"]["type"] == "traffic_update"
+
+def test_batch_item_timeout_is_capped_at_single_request_timeout(monkeypatch):
+    import asyncio
+    import main
+
+    timeouts = []
+
+    async def fake_process(request, timeout):
+        timeouts.append(timeout)
+
+    monkeypatch.setattr(main, "_process_agent_request", fake_process)
+    monkeypatch.setattr(main.Config, "REQUEST_TIMEOUT_SECONDS", 5.0)
+
+    async def scenario():
+        deadline = asyncio.get_running_loop().time() + 10.0
+        await main._run_batch_item(None, deadline, asyncio.Semaphore(1))
+
+    asyncio.run(scenario())
+    assert timeouts == [5.0]
+
+class StubMaps:
+    """Records Directions calls and answers each with two driving-style routes."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def directions(self, origin, destination, mode, **kwargs):
+        with self.lock:
+            self.calls.append((origin, destination, mode, kwargs.get("alternatives", False)))
+        leg = {
+            "duration": {"value": 1800, "text": "30 mins"},
+            "duration_in_traffic": {"value": 2000, "text": "33 mins"},
+            "distance": {"value": 12000, "text": "12 km"},
+            "start_location": {"lat": 40.0, "lng": -74.0},
+            "end_location": {"lat": 40.1, "lng": -74.1},
+            "steps": [],
+        }
+        routes = [{"summary": "Main St", "legs": [leg]}, {"summary": "Side St", "legs": [leg]}]
+        return routes if kwargs.get("alternatives") else routes[:1]
+
+def test_batch_shares_one_driving_lookup_across_query_types(monkeypatch):
+    from fastapi.testclient import TestClient
+    import agent_graph
+    import main
+
+    maps = StubMaps()
+    monkeypatch.setattr(agent_graph.logic, "gmaps", maps)
+    queries = ["best route from home to airport"] * 5 + ["how should I travel from home to airport"] * 3
+    batch = {"requests": [{"messages": [{"role": "user", "content": q}]} for q in queries]}
+    with TestClient(main.app) as client:
+        body = client.post("/commuter-agent/batch", json=batch).json()
+
+    assert [r["status"] for r in body["results"]] == ["success"] * 8
+    assert body["results"][5]["data"]["message"]["type"] == "travel_mode_suggestion"
+    driving = [call for call in maps.calls if call[2] == "driving"]
+    assert driving == [("home", "airport", "driving", True)]
+    # Route recommendations still see the alternative routes
+    routes = body["results"][0]["data"]["message"]["routes"]
+    assert [route["description"] for route in routes[:2]] == ["Main St", "Side St"]
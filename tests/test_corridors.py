@@ -0,0 +1,77 @@
+from commuter_agent import CommuterAgentLogic
+from corridors import CorridorStats
+
+def test_empty_streak_expires_well_before_distance():
+    stats = CorridorStats(ttl_seconds=86400, streak_ttl_seconds=1800)
+    stats.record_distance("Home", "Office", 5000, now=0)
+    for _ in range(3):
+        stats.record_outcome("home", "office ", "transit", False, now=0)
+    assert stats.empty_streak("HOME", "office", "transit", now=100) == 3
+    assert stats.empty_streak("home", "office", "transit", now=1800) == 0
+    assert stats.distance("home", "office", now=1800) == 5000
+
+def test_successful_lookup_resets_streak():
+    stats = CorridorStats()
+    stats.record_outcome("a", "b", "transit", False)
+    stats.record_outcome("a", "b", "transit", True)
+    assert stats.empty_streak("a", "b", "transit") == 0
+
+def test_stores_are_swept_and_capped():
+    stats = CorridorStats(ttl_seconds=10, streak_ttl_seconds=10, max_entries=100)
+    for k in range(1000):
+        stats.record_distance(f"origin {k}", "b", 1000, now=0)
+        stats.record_outcome(f"origin {k}", "b", "transit", False, now=0)
+    assert len(stats._distances) == 100
+    assert len(stats._empty_streaks) == 100
+    stats.record_distance("fresh", "b", 1000, now=100)
+    stats.record_outcome("fresh", "b", "transit", False, now=100)
+    assert len(stats._distances) == 1
+    assert len(stats._empty_streaks) == 1
+
+class _FakeMaps:
+    def __init__(self, distance):
+        self.distance = distance
+        self.calls = []
+
+    def directions(self, origin, destination, mode, **kwargs):
+        self.calls.append(mode)
+        if mode == "transit":
+            return []
+        return [{"legs": [{
+            "duration": {"value": 1800},
+            "distance": {"value": self.distance},
+            "start_location": {"lat": 40.0, "lng": -74.0},
+            "end_location": {"lat": 40.5, "lng": -74.0},
+            "steps": []
+        }]}]
+
+def _logic(monkeypatch, distance):
+    import commuter_agent
+    stats = CorridorStats()
+    monkeypatch.setattr(commuter_agent, "corridor_stats", stats)
+    logic = CommuterAgentLogic()
+    logic.gmaps = _FakeMaps(distance)
+    return logic, stats
+
+def test_long_trip_skips_bike_lookup(monkeypatch):
+    logic, stats = _logic(monkeypatch, 80000)
+    result = logic.suggest_travel_mode("which mode from home to far city")
+    assert "bicycling" not in logic.gmaps.calls
+    assert [m["mode"] for m in result["pruned_modes"]] == ["Bike"]
+    assert all(m["mode"] != "Bike" for m in result["modes"])
+    assert stats.calls_saved == 1
+
+def test_transit_pruned_after_empty_streak_then_retried(monkeypatch):
+    logic, stats = _logic(monkeypatch, 5000)
+    for _ in range(3):
+        logic.suggest_travel_mode("which mode from home to office")
+    logic.gmaps.calls.clear()
+    result = logic.suggest_travel_mode("which mode from home to office")
+    assert logic.gmaps.calls == ["driving", "bicycling"]
+    assert [m["mode"] for m in result["pruned_modes"]] == ["Public Transit"]
+
+    # Once the streak expires, transit is queried again
+    stats._empty_streaks.sweep(now=float("inf"))
+    logic.gmaps.calls.clear()
+    logic.suggest_travel_mode("which mode from home to office")
+    assert "transit" in logic.gmaps.calls
@@ -0,0 +1,120 @@
+import math
+
+import numpy as np
+
+from commuter_agent import CommuterAgentLogic
+from expiring import ExpiringDict
+from incidents import IncidentIndex, METERS_PER_DEGREE
+
+def _reference_segment_distance(lat, lng, a, b):
+    kx = METERS_PER_DEGREE * math.cos(math.radians(lat))
+    ax, ay = (a[1] - lng) * kx, (a[0] - lat) * METERS_PER_DEGREE
+    bx, by = (b[1] - lng) * kx, (b[0] - lat) * METERS_PER_DEGREE
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / length_sq))
+    return math.hypot(ax + t * dx, ay + t * dy)
+
+def test_expiring_dict_sweeps_and_caps():
+    evicted = []
+    store = ExpiringDict(ttl_seconds=10, max_entries=3, on_evict=lambda key, value: evicted.append(key))
+    for key in "abc":
+        store.set(key, key.upper(), now=0)
+    store.set("a", "A", now=5)  # refresh moves "a" to the back
+    store.set("d", "D", now=5)  # over the cap: evicts "b", the entry closest to expiry
+    assert evicted == ["b"]
+    assert store.get("c", now=9) == "C"
+    assert store.get("c", now=10) is None
+    assert len(store) == 2
+    store.sweep(now=100)
+    assert len(store) == 0
+
+def test_expired_entries_are_released_without_being_queried():
+    index = IncidentIndex(ttl_seconds=10)
+    for k in range(1000):
+        index.add(f"Accident {k}", 40 + k * 0.01, -74.0, now=0)
+        index.record_place(f"place {k}", 40.0, -74.0, "Light", now=0)
+    index.add("Accident new", 0.0, 0.0, now=100)
+    index.record_place("new place", 0.0, 0.0, "Light", now=100)
+    assert len(index) == 1
+    assert len(index._cells) == 1
+    assert len(index._places) == 1
+
+def test_index_is_capped():
+    index = IncidentIndex(max_entries=50)
+    for k in range(500):
+        index.add(f"Accident {k}", 40 + k * 0.01, -74.0)
+    assert len(index) == 50
+    assert len(index._cells) == 50
+
+def test_along_route_matches_brute_force():
+    rng = np.random.default_rng(7)
+    index = IncidentIndex()
+    incidents = rng.uniform([40.6, -74.1], [40.9, -73.8], (2000, 2))
+    for k, (lat, lng) in enumerate(incidents):
+        index.add(f"Accident {k}", lat, lng)
+    route = [tuple(p) for p in np.cumsum(rng.normal(0, 0.0008, (300, 2)), axis=0) + [40.75, -73.95]]
+
+    found = index.along_route(route)
+
+    expected = set()
+    for k, (lat, lng) in enumerate(incidents):
+        distances = [_reference_segment_distance(lat, lng, a, b) for a, b in zip(route[:-1], route[1:])]
+        if min(distances) <= 500:
+            expected.add(f"Accident {k}")
+    assert expected
+    assert {incident.text for incident in found} == expected
+
+def test_near_and_along_route_across_hemispheres():
+    index = IncidentIndex()
+    index.add("Accident in Sydney", -33.87, 151.21)
+    index.add("Accident in New York", 40.70, -74.00)
+    assert [i.text for i in index.near(-33.871, 151.211)] == ["Accident in Sydney"]
+    assert [i.text for i in index.along_route([(40.69, -74.01), (40.71, -73.99)])] == ["Accident in New York"]
+    assert index.along_route([(10.0, 10.0), (10.01, 10.01)]) == []
+
+class _FakeMaps:
+    def directions(self, origin, destination, mode, **kwargs):
+        return [{
+            "legs": [{
+                "duration": {"value": 1200},
+                "distance": {"value": 5000},
+                "start_location": {"lat": 40.0, "lng": -74.0},
+                "end_location": {"lat": 40.02, "lng": -74.0},
+                "steps": [{"start_location": {"lat": 40.01, "lng": -74.0},
+                           "warnings": [f"Construction on the {mode} route"]}]
+            }]
+        }]
+
+def test_warnings_from_every_mode_are_indexed(monkeypatch):
+    import commuter_agent
+    index = IncidentIndex()
+    monkeypatch.setattr(commuter_agent, "incident_index", index)
+    logic = CommuterAgentLogic()
+    logic.gmaps = _FakeMaps()
+    for mode in ("driving", "transit", "bicycling"):
+        logic._directions("home", "office", mode)
+    assert sorted(i.text for i in index.near(40.01, -74.0)) == [
+        "Construction on the bicycling route",
+        "Construction on the driving route",
+        "Construction on the transit route",
+    ]
+
+def test_place_hit_rate_counts_lookups_answered_from_memory():
+    index = IncidentIndex()
+    assert index.place_hit_rate() is None
+    index.record_place("Downtown", 40.0, -74.0, "Heavy")
+    assert index.lookup_place("downtown") == (40.0, -74.0, "Heavy")
+    assert index.lookup_place("uptown") is None
+    assert index.place_hit_rate() == 0.5
+
+def test_same_text_at_different_locations_stays_separate():
+    index = IncidentIndex()
+    index.add("Accident ahead", 40.7001, -74.0001)
+    index.add("Accident ahead", 40.7040, -74.0040)  # same cell, ~550 m away
+    index.add("Accident ahead", 40.70012, -74.00008)  # same spot reported again: a refresh
+    assert len(index) == 2
+    found = index.near(40.7040, -74.0040, radius_meters=100)
+    assert [(i.lat, i.lng) for i in found] == [(40.7040, -74.0040)]
+    route = [(40.7001, -74.0001), (40.7001, -73.9990)]
+    assert [(i.lat, i.lng) for i in index.along_route(route, radius_meters=50)] == [(40.70012, -74.00008)]
@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pytest
+
+from polyline import decode_polyline, decode_polyline_array, encode_polyline, route_geometry, simplify_polyline, METERS_PER_DEGREE
+
+def _reference_encode(points):
+    """Scalar encoder, straight from Google's algorithm description."""
+    out = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        ilat, ilng = round(lat * 1e5), round(lng * 1e5)
+        for delta in (ilat - prev_lat, ilng - prev_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lng = ilat, ilng
+    return "".join(out)
+
+def _reference_simplify(points, tolerance):
+    """Recursive Douglas-Peucker on the same local projection."""
+    scale = np.array([METERS_PER_DEGREE, METERS_PER_DEGREE * math.cos(math.radians(points[:, 0].mean()))])
+    xy = points * scale
+    keep = {0, len(points) - 1}
+
+    def split(first, last):
+        if last - first < 2:
+            return
+        a, b = xy[first], xy[last]
+        ab = b - a
+        length_sq = ab @ ab
+        best, best_distance = None, -1.0
+        for k in range(first + 1, last):
+            t = 0.0 if length_sq == 0 else min(1.0, max(0.0, ((xy[k] - a) @ ab) / length_sq))
+            distance = float(np.hypot(*(xy[k] - (a + t * ab))))
+            if distance > best_distance:
+                best, best_distance = k, distance
+        if best_distance > tolerance:
+            keep.add(best)
+            split(first, best)
+            split(best, last)
+
+    split(0, len(points) - 1)
+    return points[sorted(keep)]
+
+def _random_route(rng, n):
+    return np.cumsum(rng.normal(0, 0.001, (n, 2)), axis=0) + rng.uniform([-60, -170], [60, 170])
+
+def test_decode_known_google_example():
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert decode_polyline("") == []
+
+@pytest.mark.parametrize("encoded", [
+    "_p~iF~ps|U_ulLnnqC_mqNvxq`",  # final value truncated (continuation bit set)
+    "_p~iF~ps|U_ulLnnqC_mqN",  # latitude without its longitude
+    "_p~iF~ps|U 1",  # characters below '?'
+    "_p~iF~ps|U\x7f",  # character above '~'
+    "_p~iF~ps|Ué",  # not ASCII
+])
+def test_decode_rejects_malformed_input(encoded):
+    with pytest.raises(ValueError):
+        decode_polyline_array(encoded)
+
+def test_codec_round_trip_matches_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        points = np.round(_random_route(rng, int(rng.integers(1, 60))), 5)
+        encoded = encode_polyline(points)
+        assert encoded == _reference_encode(points)
+        np.testing.assert_allclose(decode_polyline_array(encoded), points, atol=1e-9)
+
+def test_simplify_matches_reference_douglas_peucker():
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        points = _random_route(rng, int(rng.integers(3, 120)))
+        tolerance = float(rng.choice([1.0, 20.0, 100.0, 500.0]))
+        simplified, applied = simplify_polyline(points, tolerance)
+        assert applied == tolerance
+        np.testing.assert_array_equal(simplified, _reference_simplify(points, tolerance))
+
+def test_max_points_equals_reference_at_applied_tolerance():
+    rng = np.random.default_rng(2)
+    for _ in range(50):
+        points = _random_route(rng, 200)
+        simplified, applied = simplify_polyline(points, 5.0, max_points=40)
+        assert len(simplified) <= 40
+        assert applied >= 5.0
+        # Scalar and vectorized distances can differ in the last bit, so compare just above the tolerance
+        np.testing.assert_array_equal(simplified, _reference_simplify(points, applied * (1 + 1e-9)))
+
+@pytest.mark.parametrize("max_points", [2, 10, 200])
+def test_route_geometry_is_bounded(max_points):
+    points = _random_route(np.random.default_rng(3), 500)
+    geometry = route_geometry(encode_polyline(points), 1.0, max_points)
+    assert geometry["original_points"] == 500
+    assert geometry["points"] <= max_points
+    assert len(decode_polyline_array(geometry["polyline"])) == geometry["points"]
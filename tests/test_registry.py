@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import registry
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_registration_retries_with_exponential_backoff(supervisor, monkeypatch):
+    supervisor.fail_registrations = 4
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def record_sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(registry.asyncio, "sleep", record_sleep)
+    asyncio.run(registry.register_with_retry())
+
+    # Doubles from REGISTRATION_BACKOFF_SECONDS and is capped at REGISTRATION_MAX_BACKOFF_SECONDS
+    assert delays == [0.01, 0.02, 0.04, 0.04]
+    assert len(supervisor.registrations) == 1
+    registration = supervisor.registrations[0]
+    assert registration["agent_id"] == "commuter_agent_01"
+    assert registration["api_url"].endswith("/commuter-agent")
+
+def test_registration_keeps_retrying_past_max_attempts(supervisor, monkeypatch):
+    monkeypatch.setattr(registry.Config, "REGISTRATION_MAX_ATTEMPTS", 2)
+    supervisor.fail_registrations = 6
+    asyncio.run(asyncio.wait_for(registry.register_with_retry(), timeout=5))
+    assert len(supervisor.registrations) == 1
+
+def test_reregisters_when_supervisor_forgets_agent(supervisor):
+    async def scenario():
+        task = asyncio.create_task(registry.run_supervisor_link())
+        try:
+            while not supervisor.heartbeats:
+                await asyncio.sleep(0.01)
+            supervisor.forget_agents()
+            while len(supervisor.registrations) < 2:
+                await asyncio.sleep(0.01)
+            heartbeats = len(supervisor.heartbeats)
+            while len(supervisor.heartbeats) == heartbeats:
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+    assert len(supervisor.registrations) == 2
+
+def test_heartbeat_reports_live_load_from_running_app(supervisor):
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        response = client.post("/commuter-agent", json={"messages": [{"role": "user", "content": "best route to downtown"}]})
+        assert response.json()["status"] == "success"
+        assert _wait_for(lambda: any(h["load"]["p95_latency_ms"] is not None for h in supervisor.heartbeats))
+
+    # Leaving the client runs lifespan shutdown, which announces draining last
+    assert supervisor.heartbeats[-1]["status"] == "draining"
+    heartbeat = [h for h in supervisor.heartbeats if h["load"]["p95_latency_ms"] is not None][0]
+    assert heartbeat["agent_id"] == "commuter_agent_01"
+    assert heartbeat["status"] == "active"
+    assert heartbeat["instance_id"] == supervisor.registrations[0]["instance_id"]
+    assert heartbeat["instance_id"].startswith(heartbeat["replica_id"] + ":")
+    load = heartbeat["load"]
+    assert load["in_flight_requests"] == 0
+    assert load["p95_latency_ms"] > 0
+    # Signals are read from the heartbeat's worker thread, not the event loop
+    assert isinstance(load["executor_queue_depth"], int)
+
+def test_draining_not_announced_before_registration(supervisor, monkeypatch):
+    monkeypatch.setattr(registry, "registered", False)
+    asyncio.run(registry.announce_draining())
+    assert supervisor.heartbeats == []
+
+def test_draining_waits_for_heartbeat_in_flight(supervisor):
+    async def scenario():
+        task = asyncio.create_task(registry.run_supervisor_link())
+        while not supervisor.heartbeats:
+            await asyncio.sleep(0.01)
+        # Hold the next heartbeat at the Supervisor, then shut down while it is in flight
+        supervisor.delay_next_seconds = 0.3
+        while registry._outbound.done():
+            await asyncio.sleep(0.005)
+        task.cancel()
+        await registry.announce_draining()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+    assert [h["status"] for h in supervisor.heartbeats][-2:] == ["active", "draining"]
+
+def test_draining_announced_when_registration_lands_during_shutdown(supervisor, monkeypatch):
+    monkeypatch.setattr(registry, "registered", False)
+    supervisor.delay_next_seconds = 0.3
+
+    async def scenario():
+        task = asyncio.create_task(registry.run_supervisor_link())
+        while registry._outbound is None or registry._outbound.done():
+            await asyncio.sleep(0.005)
+        task.cancel()
+        await registry.announce_draining()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+    assert len(supervisor.registrations) == 1
+    assert [h["status"] for h in supervisor.heartbeats] == ["draining"]
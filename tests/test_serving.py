@@ -0,0 +1,75 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import ROOT
+from test_registry import _wait_for
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_workers_register_separately_and_announce_draining_on_sigterm(supervisor):
+    env = dict(
+        os.environ,
+        API_HOST="127.0.0.1",
+        API_PORT=str(_free_port()),
+        WORKERS="2",
+        SUPERVISOR_ENABLED="true",
+        SUPERVISOR_URL=f"{supervisor.base_url}/register",
+        SUPERVISOR_HEARTBEAT_URL=f"{supervisor.base_url}/heartbeat",
+        HEARTBEAT_INTERVAL_SECONDS="0.2",
+        DRAIN_TIMEOUT_SECONDS="30",
+    )
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        assert _wait_for(lambda: len({r["instance_id"] for r in supervisor.registrations}) == 2, timeout=30)
+        replicas = {r["replica_id"] for r in supervisor.registrations}
+        assert len(replicas) == 1
+        assert all(r["workers"] == 2 for r in supervisor.registrations)
+
+        # A half-sent request keeps uvicorn's connection drain waiting
+        client = socket.create_connection(("127.0.0.1", int(env["API_PORT"])))
+        client.sendall(b"POST /commuter-agent HTTP/1.1\r\nHost: test\r\nContent-Type: application/json\r\n"
+                       b"Content-Length: 100\r\n\r\n{")
+        server.send_signal(signal.SIGTERM)
+        draining = lambda: {h["instance_id"] for h in supervisor.heartbeats if h["status"] == "draining"}
+        # Announced at the signal, while the open request is still being drained
+        assert _wait_for(lambda: len(draining()) == 2, timeout=15)
+        assert server.poll() is None
+        client.close()
+        assert server.wait(timeout=15) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+
+def test_agent_calls_counted_until_their_thread_finishes(monkeypatch):
+    import main
+
+    release = threading.Event()
+    monkeypatch.setattr(main.app_graph, "invoke", lambda inputs: release.wait(5))
+    monkeypatch.setattr(main.Config, "AGENT_EXECUTOR_THREADS", 1)
+    monkeypatch.setattr(main, "agent_executor", ThreadPoolExecutor(1))
+
+    async def scenario():
+        calls = [asyncio.ensure_future(main._run_agent({})) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert (main.agent_calls_pending, main._executor_queue_depth()) == (3, 2)
+        # A timed-out request leaves its call queued or running; it stays counted
+        calls[0].cancel()
+        await asyncio.sleep(0.05)
+        assert main.agent_calls_pending == 3
+        release.set()
+        await asyncio.gather(*calls[1:])
+
+    asyncio.run(scenario())
+    main.agent_executor.shutdown(wait=True)
+    assert main.agent_calls_pending == 0